@@ -1,5 +1,6 @@
+import asyncio
+import multiprocessing
 import time
-from threading import Thread
 import sys
 import os
 from router import Router, RouterConfig, Output
@@ -21,25 +22,24 @@ def main():
     if not os.path.exists("router_logs"):
         os.mkdir("router_logs")
 
-    # Start threads for every router and wait until they join
-    threads = []
-    for router in router_configs:
-        threads.append(Thread(target = run_router, args = (router,)))
+    # One process per router - each runs its own event loop, so routers
+    # execute in parallel without sharing an interpreter
+    processes = []
+    for routercfg in router_configs:
+        processes.append(multiprocessing.Process(target = run_router, args = (routercfg,)))
 
-    for t in threads:
-        t.start()
+    for p in processes:
+        p.start()
 
-    time.sleep(0.0001)
+    for p in processes:
+        p.join()
 
-    for t in threads:
-        t.join()
-  
 
 def run_router(routercfg):
     router = Router(config = routercfg, host = HOST, lifespan = ROUTER_LIFESPAN)
-    # Wait for ports to configure, prevents multithreading-socket specific annoyances
+    # Wait for sibling processes to bind their ports
     time.sleep(2)
-    router.run()
+    asyncio.run(router.run())
 
 def read_router_files():
 
@@ -53,28 +53,31 @@ def read_router_files():
       )
   
   router_configs = []
-  f = open(ROUTERS_FILE, 'r')
-  lines = f.readlines()
+  with open(ROUTERS_FILE, 'r') as f:
+      lines = f.read().splitlines()
 
-  if lines.pop(0).strip() != '[ROUTERS]':
+  if len(lines) == 0 or lines[0].strip() != '[ROUTERS]':
       raise Exception(f"Improper formatting in {ROUTERS_FILE}, refer to readme.txt")
 
-  while len(lines) != 0:
+  # Single pass over the file with an explicit index - no per-router list copies
+  i = 1
+  while i < len(lines):
 
       # File formatting check
       if (
-          lines[0][:3] != 'id:' or
-          lines[1][:7] != 'inputs:' or
-          lines[2][:8] != 'outputs:' or
-          (len(lines) >= 4 and lines[3].strip() != '')
+          i + 2 >= len(lines) or
+          not lines[i].startswith('id:') or
+          not lines[i + 1].startswith('inputs:') or
+          not lines[i + 2].startswith('outputs:') or
+          (i + 3 < len(lines) and lines[i + 3].strip() != '')
       ):
           raise Exception(f"Improper formatting in {ROUTERS_FILE}, refer to readme.txt")
 
       # Parsing
       try:
-          id = int(lines[0][3:].strip())
-          inputs = [int(i.strip()) for i in lines[1][7:].strip().split(',')]
-          outputs = [_to_output(i) for i in lines[2][8:].strip().split(',')]
+          id = int(lines[i][3:].strip())
+          inputs = [int(s.strip()) for s in lines[i + 1][7:].strip().split(',')]
+          outputs = [_to_output(s) for s in lines[i + 2][8:].strip().split(',')]
 
       except Exception as e:
           raise  Exception(f"Improper formatting in {ROUTERS_FILE}, refer to readme.txt")
@@ -87,8 +90,8 @@ def read_router_files():
           )
       )
 
-      lines = lines[4:] if len(lines) >= 4 else []
-  
+      i += 4
+
   if len(router_configs) > ROUTERS_MAX:
       raise Exception(f"Too many routers defined in routers.txt, maximum: {ROUTERS_MAX}")\
 
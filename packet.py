@@ -1,6 +1,11 @@
 import struct
 import socket
-import datetime
+import time
+
+# Precompiled struct objects - parsing the format string once at import
+# instead of on every pack/unpack call
+HEADER_STRUCT = struct.Struct("!BBH")
+RTE_STRUCT = struct.Struct("!HHIIII")
 
 class Packet:
     '''
@@ -9,6 +14,8 @@ class Packet:
     body, made from RTEs (N*20 bytes)
     '''
 
+    __slots__ = ('header', 'rtes', '_data')
+
     def __init__(self, data=None, header=None, rtes=None):
 
         if data:
@@ -18,31 +25,17 @@ class Packet:
             self._from_host(header, rtes)
 
     def __repr__(self):
-        return f"RIPPacket: Command {self.header.cmd}, Ver. {self.header.ver}, number of RTEs {len(self.rtes)}."
+        return f"RIPPacket: Command {self.header.cmd}, Ver. {self.header.ver}, number of RTEs {self.rte_count()}."
 
     def _from_network(self, data):
         '''
         Raw data received from network
+        Only the header is parsed here, RTEs are decoded lazily by iter_rtes
         '''
 
-        datalen = len(data)
-
-        # Parse packet into Header and RTEs
-        rte_count = int((datalen - Header.SIZE) / RTE.SIZE)
-
         self.header = Header(data[0:Header.SIZE])
-
-        rte_start = Header.SIZE
-        rte_end = Header.SIZE + RTE.SIZE
-
-        self.rtes = []
-
-        # Loop over data packet to obtain each RTE
-        for _ in range(rte_count):
-            self.rtes.append(RTE(raw_data = data[rte_start:rte_end], src_id=self.header.src))
-
-            rte_start += RTE.SIZE
-            rte_end += RTE.SIZE
+        self.rtes = None
+        self._data = data
 
     def _from_host(self, header, rtes):
         '''
@@ -51,18 +44,44 @@ class Packet:
 
         self.header = header
         self.rtes = rtes
+        self._data = None
+
+    def rte_count(self):
+        '''
+        Number of RTEs carried by the packet
+        '''
+        if self.rtes is not None:
+            return len(self.rtes)
+        return (len(self._data) - Header.SIZE) // RTE.SIZE
+
+    def iter_rtes(self):
+        '''
+        Yield raw (afi, tag, addr, mask, next_hop, metric) tuples straight
+        from the receive buffer, without materializing RTE objects
+        '''
+        return RTE_STRUCT.iter_unpack(self._data[Header.SIZE:])
 
     def serialize(self):
         '''
         Convert into byte string for transmission
         '''
 
-        packet = self.header.serialize()
+        # Pack everything into one preallocated buffer instead of
+        # concatenating a bytes object per RTE
+        buf = bytearray(Header.SIZE + len(self.rtes) * RTE.SIZE)
+
+        HEADER_STRUCT.pack_into(buf, 0, self.header.cmd, self.header.ver, self.header.src)
 
-        for rte in self.rtes:
-            packet += rte.serialize()
+        for i, rte in enumerate(self.rtes):
+            RTE_STRUCT.pack_into(buf, Header.SIZE + i * RTE.SIZE,
+                                 rte.afi,
+                                 rte.tag,
+                                 rte.addr,
+                                 rte.mask,
+                                 rte.next_hop,
+                                 rte.metric)
 
-        return packet
+        return bytes(buf)
 
 
 class Header:
@@ -75,15 +94,14 @@ class Header:
     In this simulation MBZ field is used for source router ID
     '''
 
-    FORMAT = "!BBH"
-    SIZE = struct.calcsize(FORMAT)
+    __slots__ = ('cmd', 'ver', 'src')
+
+    SIZE = HEADER_STRUCT.size
     COMMAND_RESPONSE = 2
     VERSION = 2
 
     def __init__(self, raw_data=None, router_id=None):
 
-        self.packed = None
-
         if raw_data:
             self._from_network(raw_data)
         elif router_id:
@@ -96,11 +114,7 @@ class Header:
         '''
         Raw data received from network
         '''
-        header = struct.unpack(self.FORMAT, raw_data)
-
-        self.cmd = header[0]
-        self.ver = header[1]
-        self.src = header[2]
+        self.cmd, self.ver, self.src = HEADER_STRUCT.unpack(raw_data)
 
     def _from_host(self, router_id):
         '''
@@ -114,7 +128,7 @@ class Header:
         '''
         Convert into byte string for transmission
         '''
-        return struct.pack(self.FORMAT, self.cmd, self.ver, self.src)
+        return HEADER_STRUCT.pack(self.cmd, self.ver, self.src)
 
 
 class RTE:
@@ -129,12 +143,17 @@ class RTE:
     Metric (4 bytes)
     '''
 
+    __slots__ = ('afi', 'tag', 'addr', 'mask', 'next_hop', 'metric',
+                 'changed', 'imported', 'timeout', 'is_garbage', '_key')
+
     AF_INET = 2 # ipv4
-    FORMAT = "!HHIIII"
-    SIZE = struct.calcsize(FORMAT)
+    SIZE = RTE_STRUCT.size
     MIN_METRIC = 0
     MAX_METRIC = 16
 
+    # Freelist of released instances, reused by acquire
+    _pool = []
+
     def __init__(self, raw_data=None, src_id=None, address=None,
                  next_hop=None, metric=None, imported=False):
 
@@ -147,6 +166,28 @@ class RTE:
         else:
             self._from_host(address, next_hop, metric)
 
+    @classmethod
+    def acquire(cls, address, next_hop, metric):
+        '''
+        Get an RTE from the pool, or construct one if the pool is empty
+        '''
+        if cls._pool:
+            rte = cls._pool.pop()
+            rte.changed = False
+            rte.imported = False
+            rte.init_timeout()
+            rte._from_host(address, next_hop, metric)
+            return rte
+
+        return cls(address = address, next_hop = next_hop, metric = metric)
+
+    @classmethod
+    def release(cls, rte):
+        '''
+        Return an RTE to the pool for later reuse
+        '''
+        cls._pool.append(rte)
+
     def __repr__(self):
         return '|{:^13}|{:^10}|{:^12}|{:^14}|{:^12}|\n'.format(
                     self.addr,
@@ -160,17 +201,13 @@ class RTE:
         '''
         Raw data received from network
         '''
-        rte = struct.unpack(self.FORMAT, raw_data)
-
-        self.afi = rte[0]
-        self.tag = rte[1]
-        self.addr = rte[2]
-        self.mask = rte[3]
-        self.next_hop = rte[4]
-        self.metric = rte[5]
+        (self.afi, self.tag, self.addr,
+         self.mask, self.next_hop, self.metric) = RTE_STRUCT.unpack(raw_data)
 
         if self.next_hop == 0:
             self.next_hop = src_id
+
+        self._update_key()
     
     def _from_host(self, address, next_hop, metric):
         '''
@@ -183,6 +220,8 @@ class RTE:
         self.next_hop = next_hop
         self.metric = metric
 
+        self._update_key()
+
     def init_timeout(self):
         '''
         Set timeout
@@ -191,35 +230,43 @@ class RTE:
         if self.imported:
             self.timeout = None
         else:
-            self.timeout = datetime.datetime.now()
+            self.timeout = time.monotonic()
 
         self.is_garbage = False
 
+    def _update_key(self):
+        '''
+        Cache the identity fields as a tuple so equality is a single
+        C-level compare, refreshed on every field mutation
+        '''
+        self._key = (self.afi, self.tag, self.addr,
+                     self.mask, self.next_hop, self.metric)
+
     def __eq__(self, other):
 
-        return  (
-                    self.afi == other.afi and
-                    self.addr == other.addr and
-                    self.mask == other.mask and
-                    self.tag == other.tag and 
-                    self.next_hop == other.next_hop and 
-                    self.metric == other.metric
-                )
+        return self._key == other._key
 
     def serialize(self):
         '''
         Convert into byte string for transmission
         '''
-        return struct.pack(self.FORMAT,
-                           self.afi,
-                           self.tag,
-                           self.addr,
-                           self.mask,
-                           self.next_hop,
-                           self.metric)
+        return RTE_STRUCT.pack(self.afi,
+                               self.tag,
+                               self.addr,
+                               self.mask,
+                               self.next_hop,
+                               self.metric)
     
     def set_next_hop(self, next_hop):
         '''
         Self (non-static) variables must be set through functions
         '''
-        self.next_hop = next_hop
\ No newline at end of file
+        self.next_hop = next_hop
+        self._update_key()
+
+    def set_metric(self, metric):
+        '''
+        Self (non-static) variables must be set through functions
+        '''
+        self.metric = metric
+        self._update_key()
\ No newline at end of file
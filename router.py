@@ -1,15 +1,19 @@
+import asyncio
 import socket
 import sys
-import time
-import select
 import os
-import threading
-import datetime
-from packet import RTE, Packet, Header
+import time
+from packet import RTE, Packet, Header, HEADER_STRUCT, RTE_STRUCT
+
+# Routing table log row separators, built once
+SEPARATOR = "+-------------+----------+------------+--------------+------------+\n"
+SELF_SEPARATOR = "|_____________|__________|____________|______________|____________|\n"
 
 
 class Output:
 
+    __slots__ = ('id', 'port', 'metric')
+
     def __init__(self, id, port, metric):
         self.id = id
         self.port = port
@@ -17,6 +21,8 @@ class Output:
 
 class RouterConfig:
 
+    __slots__ = ('id', 'inputs', 'outputs')
+
     def __init__(self, id, inputs, outputs):
         self.id = id
         self.inputs = inputs
@@ -33,6 +39,8 @@ class Router:
         self.id = None,
         self.inputs = {}
         self.outputs = {}
+        # Flat {neighbour id: link cost} map for the receive hot path
+        self._link_metric = {}
         self.routing_table = {}
         self.id = config.id
         self.host = host
@@ -46,11 +54,28 @@ class Router:
 
         # How long the simulated router lives
         self.end_life = False
-        
+
+        # Event loop, set once run() starts
+        self._loop = None
+
+        # Reusable receive buffer - one allocation for the router's lifetime
+        self._recv_buf = bytearray(1024)
+
+        # Serialized periodic updates are cached per output and reused
+        # until the routing table version moves on
+        self._table_version = 0
+        self._update_cache = {}
+
+        # Socket used for all sends, cached by config_inputs
+        self._send_sock = None
+
         self.config_inputs(config.inputs)
         self.config_outputs(config.outputs)
         self.config_io()
-        
+
+        # Header fields never change, pack them once
+        self._header_bytes = HEADER_STRUCT.pack(Header.COMMAND_RESPONSE, Header.VERSION, self.id)
+
         # Add self to routing table
         self.routing_table[self.id] = RTE(
             address = self.id,
@@ -62,19 +87,24 @@ class Router:
         # Log initial table state
         self.log_routing_table()
     
-    def run(self):
+    async def run(self):
+        self._loop = asyncio.get_event_loop()
+
+        # Register every input socket with the event loop, packets are
+        # drained in drain_socket whenever a socket becomes readable
+        for sock in self.inputs.values():
+            sock.setblocking(False)
+            self._loop.add_reader(sock, self.drain_socket, sock)
+
         self.config_timers()
-        end = time.time() + self.lifespan
-        while time.time() < end:
-            # Wait until atleast one input is ready for reading
-            readable_ports = select.select(self.inputs.values(), [], [])[0]
-            if readable_ports:
-                self.handle_inputs(readable_ports)
-        time.sleep(5) # let any leftover processes die out
+
+        await asyncio.sleep(self.lifespan)
+        await asyncio.sleep(5) # let any leftover processes die out
         self.f.close()
         self.end_life = True
-        for port in self.inputs:
-            self.inputs[port].close()
+        for sock in self.inputs.values():
+            self._loop.remove_reader(sock)
+            sock.close()
 
     def config_outputs(self, outputs):
         '''
@@ -87,6 +117,7 @@ class Router:
                 'port': output.port,
                 'metric': output.metric,
             }
+            self._link_metric[output.id] = output.metric
 
     def config_inputs(self, inputs):
         '''
@@ -96,6 +127,7 @@ class Router:
             try:
                 self.inputs[port] = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
                 self.inputs[port].setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                self.inputs[port].setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 65536)
                 self.inputs[port].bind((self.host, port))
 
                 print(f"#{self.id} Router - {port} port socket created")
@@ -103,14 +135,27 @@ class Router:
                 print(f"{self.id} Router - ERROR creating socket {port}:\n{err}")
                 sys.exit()
 
-    def handle_inputs(self, readable_ports):
+        if self.inputs:
+            self._send_sock = next(iter(self.inputs.values()))
+
+    def drain_socket(self, sock):
         '''
-        Receive packets an update routing table as necessary
+        Read every datagram queued on the socket in one wakeup
+        instead of one recvfrom per readiness event
         '''
+        while True:
+            try:
+                nbytes = sock.recvfrom_into(self._recv_buf)[0]
+            except BlockingIOError:
+                return
+            self.handle_packet(memoryview(self._recv_buf)[:nbytes])
 
-        for port in readable_ports:
-            packet = Packet(data = port.recvfrom(1024)[0])
-            self.update_routing_table(packet)
+    def handle_packet(self, data):
+        '''
+        Receive a packet and update routing table as necessary
+        '''
+
+        self.update_routing_table(Packet(data = data))
 
         # If routing table changed force trigger an update call to all outputs
         if self.changed:
@@ -124,9 +169,9 @@ class Router:
                     rte.changed = False
 
             self.changed = False
-            
+
             delay = 2 # send update with simulated 2 second delay
-            threading.Timer(delay, self.update, [changed_rtes])
+            self._loop.call_later(delay, self.update, changed_rtes)
 
 
     def config_io(self):
@@ -137,7 +182,7 @@ class Router:
         filepath = os.path.join(os.path.dirname(os.path.realpath(__file__)), "router_logs", f"{self.id}_log.txt")
 
         try:
-            self.f = open(filepath, 'w')
+            self.f = open(filepath, 'w', buffering=65536)
         except IOError:
             print(f"{self.id} Router - ERROR opening file: {filepath}\n")
     
@@ -145,81 +190,94 @@ class Router:
         '''
         log the routing table
         '''
-        header = (
-            "+-------------+----------+------------+--------------+------------+\n"
-            f"|                  Router #{self.id}  Routing Table                       |\n"
-            "+-------------+----------+------------+--------------+------------+\n"
-            "| destination |  metric  |  next hop  |  is changed  | is garbage |\n"
-            "+-------------+----------+------------+--------------+------------+\n"
-        )
-       
-        header += repr(self.routing_table[self.id])
-        header += "|_____________|__________|____________|______________|____________|\n"
-        header += "+-------------+----------+------------+--------------+------------+\n"
-
-        rtes = ''
-        for entry in self.routing_table:
+        # Collect the pieces and write once - no quadratic string building
+        parts = [
+            SEPARATOR,
+            f"|                  Router #{self.id}  Routing Table                       |\n",
+            SEPARATOR,
+            "| destination |  metric  |  next hop  |  is changed  | is garbage |\n",
+            SEPARATOR,
+            repr(self.routing_table[self.id]),
+            SELF_SEPARATOR,
+            SEPARATOR,
+        ]
+
+        for entry, rte in self.routing_table.items():
             if entry != self.id:
-                rtes += repr(self.routing_table[entry])
-                rtes += "+-------------+----------+------------+--------------+------------+\n"
+                parts.append(repr(rte))
+                parts.append(SEPARATOR)
 
-        self.f.write(header)
-        self.f.write(rtes)
-        self.f.write('\n')
+        parts.append('\n')
+        self.f.write(''.join(parts))
 
     def update_routing_table(self, packet):
         '''
         Check if packet has better paths and update the tabel accordingly
         '''
 
-        for rte in packet.rtes:
+        # Hoist hot lookups to locals - this runs for every RTE of every
+        # received packet
+        src = packet.header.src
+        link_metric = self._link_metric[src]
+        MAX = RTE.MAX_METRIC
+        my_id = self.id
+        table = self.routing_table
+        get_route = table.get
+        update_route = self.update_route
+
+        # The next hop of every received route is the packet sender, so
+        # an RTE object is only built when a route is actually inserted
+        for afi, tag, addr, mask, next_hop, metric in packet.iter_rtes():
             # ignore own RTE
-            if rte.addr != self.id:
+            if addr != my_id:
 
                 # Fetch existing RTE if route table contains one
-                current_rte = self.routing_table.get(rte.addr)
+                current_rte = get_route(addr)
 
-                # Next hop - packet sender source router
-                rte.set_next_hop(packet.header.src)
                 # Either metric to src + received metric or 16 - unreachable
-                rte.metric = min(rte.metric + self.outputs[packet.header.src]['metric'], RTE.MAX_METRIC)
-                
+                metric = metric + link_metric
+                if metric > MAX:
+                    metric = MAX
+
                 # New Route
                 if not current_rte:
                     # Ignore if unreachable
-                    if rte.metric == RTE.MAX_METRIC:
+                    if metric == MAX:
                         return
 
                     # Set change flags and add to routing table
+                    rte = RTE.acquire(addr, src, metric)
                     rte.changed = True
                     self.changed = True
-                    self.routing_table[rte.addr] = rte
+                    self._table_version += 1
+                    table[addr] = rte
                     return
 
                 # Route exists
                 else:
-                    if rte.next_hop == current_rte.next_hop:
+                    if src == current_rte.next_hop:
 
                         # Existing route became unreachable
-                        if current_rte.metric != rte.metric and rte.metric >= RTE.MAX_METRIC:
-                            current_rte.metric = RTE.MAX_METRIC
+                        if current_rte.metric != metric and metric >= MAX:
+                            current_rte.set_metric(MAX)
                             current_rte.is_garbage = True
                             current_rte.changed = True
                             self.changed = True
+                            self._table_version += 1
 
                         # Existing route changed metric
-                        elif current_rte.metric != rte.metric:
-                            self.update_route(current_rte, rte)
+                        elif current_rte.metric != metric:
+                            update_route(current_rte, metric, src)
 
                         # Existing route didn't change
                         elif not current_rte.is_garbage:
-                            current_rte.init_timeout() 
-                
+                            current_rte.init_timeout()
+
                     # Better route through another router
-                    elif rte.metric < current_rte.metric:
-                        self.update_route(current_rte, rte)
-    
-    def update_route(self, current_rte, rte):
+                    elif metric < current_rte.metric:
+                        update_route(current_rte, metric, src)
+
+    def update_route(self, current_rte, metric, next_hop):
         '''
         Update an existing RTE with new info
         '''
@@ -227,55 +285,75 @@ class Router:
         current_rte.init_timeout()
         current_rte.is_garbage = False
         current_rte.changed = True
-        current_rte.metric = rte.metric
-        current_rte.next_hop = rte.next_hop
-        self.changed = True     
+        current_rte.set_metric(metric)
+        current_rte.set_next_hop(next_hop)
+        self.changed = True
+        self._table_version += 1
 
-    def update(self, rtes):
+    def update(self, rtes, cache=False):
         '''
         Send update to all outputs
         '''
-        if self.inputs != {}:
+        if self._send_sock != None:
+
+            sock = self._send_sock
 
-            sock = list(self.inputs.values())[0]
-            local_header = Header(router_id=self.id)
+            # Drop entries evicted from the table while this update was
+            # pending - their objects may already be reused through the
+            # RTE pool and carry another route's fields
+            table = self.routing_table
+            rtes = [entry for entry in rtes if table.get(entry.addr) is entry]
 
+            # Only the periodic full-table broadcasts ask for caching,
+            # their serialized form is reusable until the table version
+            # changes
             for output in self.outputs:
 
-                validated_rtes = []
-                for entry in rtes:
-                    if entry.next_hop != output:
-                        validated_rtes.append(entry)
-                    else:
-                        # Split horizon with poisoned reverse - if next_hop is destination output, set metric to unreachable
-                        validated_rtes.append(
-                            RTE(raw_data=None,
-                                src_id=None, address=entry.addr,
-                                next_hop=entry.next_hop, metric= RTE.MAX_METRIC,
-                                imported=entry.imported)
-                        )
-            
-                packet = Packet(header = local_header, rtes = validated_rtes)
+                if cache:
+                    cached = self._update_cache.get(output)
+                    if cached is not None and cached[0] == self._table_version:
+                        sock.sendto(cached[1], (self.host, self.outputs[output]["port"]))
+                        continue
+
+                # Pack the packet for this output directly, applying split
+                # horizon with poisoned reverse inline - no intermediate
+                # RTE or Packet objects
+                buf = bytearray(Header.SIZE + len(rtes) * RTE.SIZE)
+                buf[:Header.SIZE] = self._header_bytes
+
+                for i, entry in enumerate(rtes):
+                    # If next_hop is destination output, set metric to unreachable
+                    metric = RTE.MAX_METRIC if entry.next_hop == output else entry.metric
+                    RTE_STRUCT.pack_into(buf, Header.SIZE + i * RTE.SIZE,
+                                         entry.afi,
+                                         entry.tag,
+                                         entry.addr,
+                                         entry.mask,
+                                         entry.next_hop,
+                                         metric)
+
+                data = bytes(buf)
+
+                if cache:
+                    self._update_cache[output] = (self._table_version, data)
 
                 # Send
-                sock.sendto(packet.serialize(),(self.host, self.outputs[output]["port"]))
+                sock.sendto(data, (self.host, self.outputs[output]["port"]))
 
-    def timer(self, function, param=None):
+    def _tick(self):
         '''
-        Call specified function every {TIMER} seconds
+        Periodic tick fired every {TIMER} seconds - one scheduled callback
+        per router drives updates, RTE timeout and RTE deletion
         '''
         # Stop timer if end flag set
         if self.end_life == True:
             return
 
-        if param != None:
-            function(list(param.values()))
-            period = self.TIMER # * randrange(8, 12, 1) / 10
-        else:
-            period = self.TIMER
-            function()
+        self.update(list(self.routing_table.values()), cache=True)
+        self.check_timeout()
+        self.check_is_garbage()
 
-        threading.Timer(period, self.timer, [function, param]).start()
+        self._loop.call_later(self.TIMER, self._tick)
 
     def check_timeout(self):
         '''
@@ -285,13 +363,15 @@ class Router:
 
         if self.routing_table != {}:
 
+            now = time.monotonic()
             for rte in self.routing_table.values():
-                if rte.timeout != None and (datetime.datetime.now() - rte.timeout).total_seconds() >= self.ROUTE_TIMEOUT:
+                if rte.timeout != None and now - rte.timeout >= self.ROUTE_TIMEOUT:
                     rte.is_garbage = True
                     rte.changed = True
                     self.changed = True
-                    rte.metric = RTE.MAX_METRIC
-                    rte.timeout = datetime.datetime.now()
+                    self._table_version += 1
+                    rte.set_metric(RTE.MAX_METRIC)
+                    rte.timeout = now
                     self.log_routing_table()
 
     def check_is_garbage(self):
@@ -301,21 +381,21 @@ class Router:
 
         if self.routing_table != {}:
             to_delete = []
+            now = time.monotonic()
             for rte in self.routing_table.values():
-                if rte.is_garbage and (datetime.datetime.now() - rte.timeout).total_seconds() >= self.DELETE_TIMEOUT:
+                if rte.is_garbage and now - rte.timeout >= self.DELETE_TIMEOUT:
                     to_delete.append(rte.addr)
 
             for entry in to_delete:
-                del self.routing_table[entry]
-        
+                RTE.release(self.routing_table.pop(entry))
+
             if len(to_delete) > 0:
+                self._table_version += 1
                 self.log_routing_table()
 
 
     def config_timers(self):
         '''
-        Start timers on: periodic update, RTE timeout and RTE deletion
+        Start the periodic tick handling update, RTE timeout and RTE deletion
         '''
-        self.timer(self.update, param=self.routing_table)
-        self.timer(self.check_timeout)
-        self.timer(self.check_is_garbage)
+        self._tick()